@@ -20,3 +20,27 @@ def exec_bash(command):
                 command, out))
 
     return out
+
+
+def exec_command(args):
+
+    # Same as exec_bash, but runs the program directly from an argument list
+    # instead of going through a bash -c shell.
+    try:
+        out = subprocess.check_output(
+            args,
+            stderr=subprocess.STDOUT
+        ).decode("utf8").strip()
+
+    except subprocess.CalledProcessError as e:
+        out = e.stdout.decode("utf8")
+        raise BashError(
+            "Failed to execute '%s' :\n%s" % (
+                " ".join(str(arg) for arg in args), out))
+
+    except OSError as e:
+        raise BashError(
+            "Failed to execute '%s' : %s" % (
+                " ".join(str(arg) for arg in args), str(e)))
+
+    return out
@@ -1,14 +1,20 @@
 import os
-import psutil
-from pathlib import Path
+import functools
 import re
+import threading
 import dbus
-import psutil
 import py3nvml.py3nvml as nvml
-from .bash import exec_bash, BashError
+from .bash import exec_bash, exec_command, BashError
 from .log_utils import get_logger
+from . import processes
 from .pci import get_gpus_bus_ids
 
+XRANDR_PROVIDER_PATTERN = re.compile("^Provider [0-9]+:")
+XRANDR_PROVIDER_NAME_PATTERN = re.compile("name:.*")
+CPUINFO_FLAGS_PATTERN = re.compile("^flags\\s*:(.*)$", re.MULTILINE)
+
+_SYSTEMD_MANAGER_LOCK = threading.Lock()
+
 
 class CheckError(Exception):
     pass
@@ -16,30 +22,48 @@ class CheckError(Exception):
 
 def is_ac_power_connected():
 
-    for power_source_path in Path("/sys/class/power_supply/").iterdir():
+    with os.scandir("/sys/class/power_supply/") as it:
 
-        try:
+        for entry in it:
 
-            with open(power_source_path / "type", 'r') as f:
-                if f.read().strip() != "Mains":
+            try:
+
+                if _read_sysfs_attribute(entry.path + "/type") != b"Mains":
                     continue
 
-            with open(power_source_path / "online", 'r') as f:
-                if f.read(1) == "1":
+                if _read_sysfs_attribute(entry.path + "/online")[:1] == b"1":
                     return True
 
-        except IOError:
-            continue
+            except OSError:
+                continue
 
     return False
 
 
-def is_pat_available():
+def _read_sysfs_attribute(path):
+
+    # sysfs attributes are tiny and served in one read, so skip the buffered
+    # file object machinery and its extra fstat/ioctl/lseek syscalls.
+    fd = os.open(path, os.O_RDONLY)
     try:
-        exec_bash("grep -E '^flags.+ pat( |$)' /proc/cpuinfo")
-        return True
-    except BashError:
-        return False
+        return os.read(fd, 64).strip()
+    finally:
+        os.close(fd)
+
+
+def is_pat_available():
+    return "pat" in _get_cpu_flags()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_cpu_flags():
+
+    with open("/proc/cpuinfo", "r") as f:
+        cpuinfo = f.read()
+
+    match = CPUINFO_FLAGS_PATTERN.search(cpuinfo)
+
+    return frozenset(match.group(1).split()) if match else frozenset()
 
 
 def get_active_renderer():
@@ -51,12 +75,9 @@ def get_active_renderer():
 
 def get_integrated_provider():
 
-    try:
-        provider = exec_bash("xrandr --listproviders")
-    except BashError as e:
-        raise CheckError("Cannot list xrandr provdiers : %s")
+    providers = _get_xrandr_providers()
 
-    for line in re.findall("name:.*", provider):
+    for line in XRANDR_PROVIDER_NAME_PATTERN.findall(providers):
         for _p in line.split("name:")[1].split():
             if _p in ["AMD", "Intel"]:
                 return line.split("name:")[1]
@@ -64,29 +85,53 @@ def get_integrated_provider():
 
 def is_module_available(module_name):
 
-    try:
-        exec_bash("modinfo %s" % module_name)
-    except BashError:
-        return False
-    else:
-        return True
+    kernel_modules = _get_kernel_modules()
+
+    if kernel_modules is None:
+        try:
+            exec_bash("modinfo %s" % module_name)
+        except BashError:
+            return False
+        else:
+            return True
+
+    return module_name.replace("-", "_") in kernel_modules
 
 def is_module_loaded(module_name):
 
+    prefix = module_name + " "
+
+    with open("/proc/modules", "r") as f:
+        return any(line.startswith(prefix) for line in f)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_kernel_modules():
+
+    modules_dir = "/lib/modules/%s" % os.uname().release
+
+    kernel_modules = set()
+
     try:
-        exec_bash("lsmod | grep -E \"^%s \"" % module_name)
-    except BashError:
-        return False
-    else:
-        return True
+        for filename in ["modules.dep", "modules.builtin"]:
+            with open(os.path.join(modules_dir, filename), "r") as f:
+                for line in f:
+                    module_path = line.split(":", 1)[0].strip()
+                    module_name = os.path.basename(module_path).split(".", 1)[0]
+                    kernel_modules.add(module_name.replace("-", "_"))
+    except IOError:
+        return None
+
+    return frozenset(kernel_modules)
 
 def detect_os():
     return os.path.isdir("/run/runit/service")
 
+@functools.lru_cache(maxsize=1)
 def _detect_init_system():
 
-    process = psutil.Process(1)
-    process_name = process.name()
+    with open("/proc/1/comm", "r") as f:
+        process_name = f.read().strip()
 
     if process_name == "runit":
         if detect_os():
@@ -134,6 +179,7 @@ def _get_openrc_display_manager(init):
     return dm_name
 
 
+@functools.lru_cache(maxsize=1)
 def using_patched_GDM():
 
     folder_path_1 = "/etc/gdm/Prime"
@@ -143,13 +189,10 @@ def using_patched_GDM():
 
 def check_offloading_available():
 
-    try:
-        out = exec_bash("xrandr --listproviders")
-    except BashError as e:
-        raise CheckError("Cannot list xrandr providers : %s" % str(e))
+    out = _get_xrandr_providers()
 
     for line in out.splitlines():
-        if re.search("^Provider [0-9]+:", line) and "name:NVIDIA-G0" in line:
+        if XRANDR_PROVIDER_PATTERN.search(line) and "name:NVIDIA-G0" in line:
             return True
     return False
 
@@ -158,9 +201,17 @@ def is_xorg_integrated_module_available():
     bus_ids = get_gpus_bus_ids()
 
     if "intel" in bus_ids:
-        return os.path.isfile("/usr/lib/xorg/modules/drivers/intel_drv.so")
+        return is_xorg_intel_module_available()
     else:
-        return os.path.isfile("/usr/lib/xorg/modules/drivers/amdgpu_drv.so")
+        return is_xorg_amdgpu_module_available()
+
+@functools.lru_cache(maxsize=1)
+def is_xorg_intel_module_available():
+    return os.path.isfile("/usr/lib/xorg/modules/drivers/intel_drv.so")
+
+@functools.lru_cache(maxsize=1)
+def is_xorg_amdgpu_module_available():
+    return os.path.isfile("/usr/lib/xorg/modules/drivers/amdgpu_drv.so")
 
 def is_login_manager_active():
     return _is_service_active("display-manager")
@@ -173,20 +224,8 @@ def is_lxdm_active():
 
 def is_daemon_active(init):
 
-    if init == "runit-artix":
-        try:
-            exec_bash("pgrep -a python3 | grep -o optimus_manager")
-        except BashError:
-            return False
-        else:
-            return True
-    elif init == "runit-void":
-        try:
-            exec_bash("pgrep -a python3 | grep  -o optimus_manager")
-        except BashError:
-            return False
-        else:
-            return True
+    if init in ["runit-void", "runit-artix"]:
+        return len(processes.get_PIDs_from_cmdline("python3", "optimus_manager")) > 0
     else:
         return _is_service_active("optimus-manager")
 
@@ -197,29 +236,33 @@ def list_processes_on_nvidia():
 
     nvml.nvmlInit()
 
-    gpu_handle = nvml.nvmlDeviceGetHandleByIndex(0)
-    proc_list = nvml.nvmlDeviceGetGraphicsRunningProcesses(gpu_handle)
+    try:
+        PIDs_set = set()
+        for gpu_index in range(nvml.nvmlDeviceGetCount()):
+            gpu_handle = nvml.nvmlDeviceGetHandleByIndex(gpu_index)
+            for proc_list in [nvml.nvmlDeviceGetGraphicsRunningProcesses(gpu_handle),
+                              nvml.nvmlDeviceGetComputeRunningProcesses(gpu_handle)]:
+                PIDs_set.update(p_nvml.pid for p_nvml in proc_list)
+    finally:
+        nvml.nvmlShutdown()
 
     result = []
-    for p_nvml in proc_list:
-        p_psutil = psutil.Process(p_nvml.pid)
-        cmdline = p_psutil.cmdline()
+    for PID_value in sorted(PIDs_set):
+        try:
+            cmdline = processes.get_PID_cmdline(PID_value)
+        except processes.ProcessesError:
+            cmdline = []
         result.append({
-            "pid": p_nvml.pid,
+            "pid": PID_value,
             "cmdline": cmdline[0] if len(cmdline) > 0 else ""
         })
 
-    nvml.nvmlShutdown()
-
     return result
 
 
 def _is_gl_provider_nvidia():
 
-    try:
-        out = exec_bash("__NV_PRIME_RENDER_OFFLOAD=0 glxinfo")
-    except BashError as e:
-        raise CheckError("Cannot run glxinfo : %s" % str(e))
+    out = _get_glxinfo()
 
     for line in out.splitlines():
         if "server glx vendor string: NVIDIA Corporation" in line:
@@ -227,6 +270,24 @@ def _is_gl_provider_nvidia():
     return False
 
 
+@functools.lru_cache(maxsize=1)
+def _get_xrandr_providers():
+
+    try:
+        return exec_command(["xrandr", "--listproviders"])
+    except BashError as e:
+        raise CheckError("Cannot list xrandr providers : %s" % str(e))
+
+
+@functools.lru_cache(maxsize=1)
+def _get_glxinfo():
+
+    try:
+        return exec_bash("__NV_PRIME_RENDER_OFFLOAD=0 glxinfo")
+    except BashError as e:
+        raise CheckError("Cannot run glxinfo : %s" % str(e))
+
+
 def _is_elogind_present():
     return os.path.isfile("/usr/lib/libelogind.so.0")
 
@@ -241,30 +302,42 @@ def _is_service_active(service_name):
     logger = get_logger()
 
     try:
-        system_bus = dbus.SystemBus()
+        systemd_manager = _get_systemd_manager()
     except dbus.exceptions.DBusException:
         logger.warning(
             "Cannot communicate with the DBus system bus to check status of %s."
             " Is DBus running ? Falling back to bash commands", service_name)
         return _is_service_active_bash(service_name)
     else:
-        return _is_service_active_dbus(system_bus, service_name)
+        return _is_service_active_dbus(systemd_manager, service_name)
+
+
+def _get_systemd_manager():
+
+    # Service checks may run from worker threads, and lru_cache does not stop
+    # them from each building their own proxy on the first call.
+    with _SYSTEMD_MANAGER_LOCK:
+        return _make_systemd_manager()
 
 
-def _is_service_active_dbus(system_bus, service_name):
+@functools.lru_cache(maxsize=1)
+def _make_systemd_manager():
 
+    system_bus = dbus.SystemBus()
     systemd = system_bus.get_object("org.freedesktop.systemd1", "/org/freedesktop/systemd1")
 
+    return dbus.Interface(systemd, "org.freedesktop.systemd1.Manager")
+
+
+def _is_service_active_dbus(systemd_manager, service_name):
+
     try:
-        unit_path = systemd.GetUnit("%s.service" % service_name, dbus_interface="org.freedesktop.systemd1.Manager")
+        units = systemd_manager.ListUnitsByNames(["%s.service" % service_name])
     except dbus.exceptions.DBusException:
         return False
 
-    optimus_manager_interface = system_bus.get_object("org.freedesktop.systemd1", unit_path)
-    properties_manager = dbus.Interface(optimus_manager_interface, 'org.freedesktop.DBus.Properties')
-    state = properties_manager.Get("org.freedesktop.systemd1.Unit", "SubState")
-
-    return state == "running"
+    # Each unit is (name, description, load state, active state, sub state, ...)
+    return len(units) > 0 and units[0][4] == "running"
 
 
 def _is_service_active_bash(service_name):
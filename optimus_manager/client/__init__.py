@@ -5,7 +5,6 @@ import argparse
 import socket
 import json
 from .. import envs
-from .. import checks
 from ..config import load_config, ConfigError
 from ..kernel_parameters import get_kernel_parameters
 from ..var import read_temp_conf_path_var, load_state, VarError
@@ -15,7 +14,7 @@ from .args import parse_args
 from .utils import ask_confirmation
 from .error_reporting import report_errors
 from .client_checks import run_switch_checks, _check_daemon_active
-from ..checks import _detect_init_system
+from ..checks import _detect_init_system, is_daemon_active
 
 
 def main():
@@ -44,7 +43,7 @@ def main():
 
         if fatal:
             print("Cannot execute command because of previous errors.\n")
-            return _check_daemon_active(init)
+            return _check_daemon_active(init, is_daemon_active(init))
 
         if args.print_mode:
             _print_current_mode(state)
@@ -178,20 +177,20 @@ def _send_command(command):
 
     except (ConnectionRefusedError, OSError):
         print("Cannot connect to the UNIX socket at %s. Is optimus-manager-daemon running ?\n"
-            "\nYou can enable and start it by running those commands as root :\n")
-        if _detect_init_system(init="systemd"):
+            "\nYou can enable and start it by running those commands as root :\n" % envs.SOCKET_PATH)
+        init = _detect_init_system()
+        if init == "systemd":
             print("\nsystemctl enable optimus-manager.service\n"
-                "systemctl start optimus-manager.service\n" % envs.SOCKET_PATH)
-        elif _detect_init_system(init="openrc"):
+                "systemctl start optimus-manager.service\n")
+        elif init == "openrc":
             print("\nrc-update add optimus-manager default\n"
-                "rc-service optimus-manager start\n" % envs.SOCKET_PATH)
-        elif _detect_init_system(init="runit"):
-            if checks.detect_os():
-                print("ln -s /etc/runit/sv/optimus-manager /var/run/runit/service\n"
-                    "sv u optimus-manager\n" % envs.SOCKET_PATH)
-            elif not checks.detect_os():
-                print("ln -s /etc/sv/optimus-manager /var/service\n"
-                    "sv u optimus-manager\n" % envs.SOCKET_PATH)
+                "rc-service optimus-manager start\n")
+        elif init == "runit-artix":
+            print("ln -s /etc/runit/sv/optimus-manager /var/run/runit/service\n"
+                "sv u optimus-manager\n")
+        elif init == "runit-void":
+            print("ln -s /etc/sv/optimus-manager /var/service\n"
+                "sv u optimus-manager\n")
         sys.exit(1)
 
 def _set_temp_config_and_exit(rel_path):
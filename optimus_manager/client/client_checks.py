@@ -1,4 +1,5 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from .. import checks
 from ..xorg import is_there_a_default_xorg_conf_file, is_there_a_MHWD_file
 from .. import sessions
@@ -15,30 +16,48 @@ def run_switch_checks(config, requested_mode, init):
     else:
         device_name = "amd"
 
-    _check_elogind_active(init)
-    _check_daemon_active(init)
+    # Those probes only wait on DBus, /proc or service managers, so they run
+    # concurrently.
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        elogind_future = executor.submit(checks.is_elogind_active)
+        daemon_future = executor.submit(checks.is_daemon_active, init)
+        bumblebeed_future = executor.submit(checks.is_bumblebeed_service_active)
+        wayland_future = executor.submit(sessions.is_there_a_wayland_session)
+
+    elogind_active = elogind_future.result()
+    daemon_active = daemon_future.result()
+    bumblebeed_active = bumblebeed_future.result()
+
+    try:
+        wayland_session_present = wayland_future.result()
+    except sessions.SessionsError as e:
+        print("ERROR : cannot check for Wayland session : %s" % str(e))
+        wayland_session_present = False
+
+    _check_elogind_active(init, elogind_active)
+    _check_daemon_active(init, daemon_active)
     _check_power_switching(config)
     _check_bbswitch_module(config)
     _check_nvidia_module(requested_mode)
     _check_patched_GDM(init)
-    _check_wayland()
-    _check_bumblebeed()
+    _check_wayland(wayland_session_present)
+    _check_bumblebeed(bumblebeed_active)
     _check_xorg_conf()
     _check_MHWD_conf()
     _check_integrated_xorg_module(config, requested_mode, device_name)
     _check_number_of_sessions()
 
 
-def _check_elogind_active(init):
+def _check_elogind_active(init, elogind_active):
 
-    if not checks.is_elogind_active() and not init == "systemd":
+    if not elogind_active and not init == "systemd":
         print("The Elogind service was not detected but is required to use optimus-manager, please install, enable and start it.")
         sys.exit(1)
 
 
-def _check_daemon_active(init):
+def _check_daemon_active(init, daemon_active):
 
-    if not checks.is_daemon_active(init):
+    if not daemon_active:
         print("The optimus-manager service is not running. Please enable and start it with :\n")
         if init == "openrc":
             print("sudo rc-service enable optimus-manager\n"
@@ -103,13 +122,7 @@ def _check_patched_GDM(init):
         if not confirmation:
             sys.exit(0)
 
-def _check_wayland():
-
-    try:
-        wayland_session_present = sessions.is_there_a_wayland_session()
-    except sessions.SessionsError as e:
-        print("ERROR : cannot check for Wayland session : %s" % str(e))
-        return
+def _check_wayland(wayland_session_present):
 
     if wayland_session_present:
         print("WARNING : there is at least one Wayland session running on this computer."
@@ -121,9 +134,9 @@ def _check_wayland():
         if not confirmation:
             sys.exit(0)
 
-def _check_bumblebeed():
+def _check_bumblebeed(bumblebeed_active):
 
-    if checks.is_bumblebeed_service_active():
+    if bumblebeed_active:
         print("WARNING : The Bumblebee service (bumblebeed.service) is running, and this can interfere with optimus-manager."
               " Before attempting a GPU switch, it is recommended that you disable this service (sudo systemctl disable bumblebeed.service)"
               " then REBOOT your computer.\n"
@@ -1,5 +1,6 @@
 import os
 import shutil
+import functools
 from pathlib import Path
 import copy
 import json
@@ -14,6 +15,7 @@ class ConfigError(Exception):
 def load_config():
     config = _load_config()
     config = _convert_deprecated(config)
+    config = _parse_nvidia_options(config)
     return config
 
 
@@ -67,6 +69,13 @@ def _convert_deprecated(config):
 
     return config
 
+def _parse_nvidia_options(config):
+
+    options = config["nvidia"]["options"].replace(" ", "").split(",")
+    config["nvidia"]["_options_set"] = frozenset(option for option in options if option != "")
+
+    return config
+
 def copy_user_config():
 
     logger = get_logger()
@@ -98,11 +107,7 @@ def _validate_config(config, fallback_config=None):
 
     logger = get_logger()
 
-    folder_path = os.path.dirname(os.path.abspath(__file__))
-    schema_path = os.path.join(folder_path, "config_schema.json")
-
-    with open(schema_path, "r") as f:
-        schema = json.load(f)
+    schema = _load_config_schema()
 
     corrected_config = copy.deepcopy(config)
 
@@ -143,6 +148,15 @@ def _validate_config(config, fallback_config=None):
 
     return corrected_config
 
+@functools.lru_cache(maxsize=1)
+def _load_config_schema():
+
+    folder_path = os.path.dirname(os.path.abspath(__file__))
+    schema_path = os.path.join(folder_path, "config_schema.json")
+
+    with open(schema_path, "r") as f:
+        return json.load(f)
+
 def _parsed_config_to_dict(config):
 
     config_dict = {}
@@ -244,6 +258,7 @@ def _validate_integer(schema_option_info, config_option_value):
     return True, None
 
 
+@functools.lru_cache(maxsize=1)
 def load_extra_xorg_options():
 
     logger = get_logger()
@@ -1,3 +1,4 @@
+import signal
 from .. import processes
 from ..log_utils import get_logger
 from ..checks import _detect_init_system, using_patched_GDM
@@ -12,13 +13,12 @@ def kill_gdm_server():
 
     if using_patched_GDM():
         try:
-            xorg_PIDs_list = processes.get_PIDs_from_process_names(["Xorg", "X"])
+            xorg_processes_list = processes.get_PIDs_and_users_from_process_names(["Xorg", "X"])
 
-            for PID_value in xorg_PIDs_list:
-                user = processes.get_PID_user(PID_value)
+            for PID_value, user in xorg_processes_list:
                 if user == "gdm" or user == "root":
                     logger.info("Found a Xorg GDM process (PID %d), killing it...", PID_value)
-                    processes.kill_PID(PID_value, signal="-KILL")
+                    processes.kill_PID(PID_value, signal=signal.SIGKILL)
 
         except processes.ProcessesError as e:
             raise RuntimeError("Error : cannot check for or kill the GDM display server : %s" % str(e))
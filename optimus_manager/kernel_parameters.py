@@ -1,6 +1,8 @@
 import re
 from .log_utils import get_logger
 
+STARTUP_PARAMETER_PATTERN = re.compile("optimus-manager\\.startup=[^ ]+")
+
 
 def get_kernel_parameters():
 
@@ -10,7 +12,7 @@ def get_kernel_parameters():
         cmdline = f.read()
 
     for item in cmdline.split():
-        if re.fullmatch("optimus-manager\\.startup=[^ ]+", item):
+        if STARTUP_PARAMETER_PATTERN.fullmatch(item):
             logger.info("Kernel parameter found: %s", item)
             startup_mode = item.split("=")[-1]
             if startup_mode not in ["igpu", "nvidia", "hybrid", "auto"]:
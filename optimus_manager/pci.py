@@ -1,5 +1,6 @@
 import os
 import re
+import functools
 from .bash import exec_bash, BashError
 from .log_utils import get_logger
 
@@ -8,9 +9,10 @@ INTEL_VENDOR_ID = "8086"
 AMD_VENDOR_ID = "1002"
 
 
-GPU_PCI_CLASS_PATTERN = "03[0-9a-f]{2}"
-AUDIO_PCI_CLASS_PATTERN = "04[0-9a-f]{2}"
-PCI_BRIDGE_PCI_CLASS_PATTERN = "0604"
+GPU_PCI_CLASS_PATTERN = re.compile("03[0-9a-f]{2}")
+AUDIO_PCI_CLASS_PATTERN = re.compile("04[0-9a-f]{2}")
+PCI_BRIDGE_PCI_CLASS_PATTERN = re.compile("0604")
+BUS_ID_SEPARATOR_PATTERN = re.compile("[.:]")
 
 
 class PCIError(Exception):
@@ -63,6 +65,7 @@ def hot_reset_nvidia():
 
 def remove_nvidia():
     _write_to_nvidia_path("remove", "1")
+    get_gpus_bus_ids.cache_clear()
 
 def is_nvidia_visible():
     bus_ids = get_gpus_bus_ids(notation_fix=False)
@@ -73,8 +76,10 @@ def is_nvidia_visible():
 
 def rescan():
     _write_to_pci_path(["/sys/bus/pci/rescan"], "1")
+    get_gpus_bus_ids.cache_clear()
 
 
+@functools.lru_cache(maxsize=None)
 def get_gpus_bus_ids(notation_fix=True):
 
     logger = get_logger()
@@ -145,13 +150,13 @@ def _get_bus_ids(match_pci_class, match_vendor_id, notation_fix=True):
             # hexadecimal format without any leading zeroes and prefixed with
             # `PCI:`, so `3c:00:0` should become `PCI:60:0:0`
             bus_id = "PCI:" + ":".join(
-                str(int(field, 16)) for field in re.split("[.:]", bus_id)
+                str(int(field, 16)) for field in BUS_ID_SEPARATOR_PATTERN.split(bus_id)
             )
 
         pci_class = items[1][:-1]
         vendor_id, _ = items[2].split(":")
 
-        if re.fullmatch(match_pci_class, pci_class) and re.fullmatch(match_vendor_id, vendor_id):
+        if match_pci_class.fullmatch(pci_class) and (match_vendor_id is None or vendor_id == match_vendor_id):
             bus_ids_list.append(bus_id)
 
     return bus_ids_list
@@ -215,7 +220,7 @@ def _read_pci_path(pci_path):
 def _get_connected_pci_bridges(pci_id):
 
     pci_bridges_ids_list = _get_bus_ids(match_pci_class=PCI_BRIDGE_PCI_CLASS_PATTERN,
-                                        match_vendor_id=".+",
+                                        match_vendor_id=None,
                                         notation_fix=False)
 
     connected_pci_bridges_ids_list = []
@@ -1,5 +1,5 @@
-from .bash import exec_bash, BashError
-from .log_utils import get_logger
+import os
+import pwd
 
 
 class ProcessesError(Exception):
@@ -8,41 +8,95 @@ class ProcessesError(Exception):
 
 def get_PIDs_from_process_names(processes_names_list):
 
-    logger = get_logger()
+    # PIDs are yielded as /proc is scanned, so a caller that only needs the
+    # first match stops the scan there.
+    for PID_value in _list_PIDs():
+
+        try:
+            process_name = _read_process_name(PID_value)
+        except OSError:
+            continue
+
+        if process_name in processes_names_list:
+            yield PID_value
+
+
+def get_PIDs_from_cmdline(process_name, cmdline_substring):
+
+    cmdline_substring = cmdline_substring.encode("utf8")
 
     PIDs_list = []
 
-    for p_name in processes_names_list:
+    for PID_value in _list_PIDs():
 
         try:
-            process_PIDs_str = exec_bash("pidof %s" % p_name)
-        except BashError:
+            if process_name not in _read_process_name(PID_value):
+                continue
+            with open("/proc/%d/cmdline" % PID_value, "rb") as f:
+                cmdline = f.read()
+        except OSError:
             continue
 
+        if cmdline_substring in cmdline:
+            PIDs_list.append(PID_value)
+
+    return PIDs_list
+
+
+def get_PIDs_and_users_from_process_names(processes_names_list):
+
+    PIDs_users_list = []
+
+    for PID_value in _list_PIDs():
+
         try:
-            process_PIDs_list = [int(pid_str) for pid_str in process_PIDs_str.split(" ")]
-        except ValueError:
-            logger.warning("Cannot parse pidof output for process %s : invalid value : %s", p_name, process_PIDs_str)
+            if _read_process_name(PID_value) not in processes_names_list:
+                continue
+            uid = os.stat("/proc/%d" % PID_value).st_uid
+        except OSError:
             continue
 
-        PIDs_list += process_PIDs_list
+        PIDs_users_list.append((PID_value, _get_username(uid)))
 
-    return PIDs_list
+    return PIDs_users_list
 
 
-def get_PID_user(PID_value):
+def get_PID_cmdline(PID_value):
 
     try:
-        user = exec_bash("ps -o uname= -p %d" % PID_value)
-    except BashError:
+        with open("/proc/%d/cmdline" % PID_value, "rb") as f:
+            cmdline = f.read()
+    except OSError:
         raise ProcessesError("PID %d does not exist" % PID_value)
 
-    return user
+    return [arg.decode("utf8", errors="replace") for arg in cmdline.split(b"\0") if arg]
 
 
 def kill_PID(PID_value, signal):
 
     try:
-        exec_bash("kill %s %d" % (signal, PID_value))
-    except BashError:
+        os.kill(PID_value, signal)
+    except OSError:
         raise ProcessesError("Cannot kill PID %d" % PID_value)
+
+
+def _list_PIDs():
+
+    with os.scandir("/proc") as it:
+        for entry in it:
+            if entry.name.isdigit():
+                yield int(entry.name)
+
+
+def _read_process_name(PID_value):
+
+    with open("/proc/%d/comm" % PID_value, "r") as f:
+        return f.read().rstrip("\n")
+
+
+def _get_username(uid):
+
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
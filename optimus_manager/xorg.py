@@ -1,13 +1,116 @@
 import os
+import stat
 from pathlib import Path
-from optimus_manager.bash import exec_bash, BashError
+from string import Template
+from optimus_manager.bash import exec_bash, exec_command, BashError
 import optimus_manager.envs as envs
 import optimus_manager.checks as checks
+import optimus_manager.processes as processes
 from .pci import get_gpus_bus_ids
 from .config import load_extra_xorg_options
-from .hacks.manjaro import remove_mhwd_conf
+from .hacks.manjaro import remove_mhwd_conf, MHWD_CONF_PATH
 from .log_utils import get_logger
 
+
+MODULES_PATHS_SECTION = (
+    "Section \"Files\"\n"
+    "\tModulePath \"/usr/lib/nvidia\"\n"
+    "\tModulePath \"/usr/lib32/nvidia\"\n"
+    "\tModulePath \"/usr/lib32/nvidia/xorg/modules\"\n"
+    "\tModulePath \"/usr/lib32/xorg/modules\"\n"
+    "\tModulePath \"/usr/lib64/nvidia/xorg/modules\"\n"
+    "\tModulePath \"/usr/lib64/nvidia/xorg\"\n"
+    "\tModulePath \"/usr/lib64/xorg/modules\"\n"
+    "EndSection\n\n"
+)
+
+YES_NO_TO_BOOL_STR = {"yes": "true", "no": "false"}
+
+SERVER_FLAGS_SECTIONS = {
+    "yes": (
+        "Section \"ServerFlags\"\n"
+        "\tOption \"IgnoreABI\" \"1\"\n"
+        "EndSection\n\n"
+    ),
+    "no": "",
+}
+
+# Which lines apply to the Device section of each GPU vendor. A driver of None
+# means it is picked from the [integrated] driver option.
+DEVICE_SECTION_SPECS = {
+    "nvidia": {
+        "driver": "nvidia",
+        "nvidia_options": True,
+        "accel": False,
+        "tearfree": False,
+        "dri": False,
+        "xorg_extra_key": "nvidia",
+    },
+    "intel": {
+        "driver": None,
+        "nvidia_options": False,
+        "accel": True,
+        "tearfree": True,
+        "dri": True,
+        "xorg_extra_key": "integrated-gpu",
+    },
+    "amdgpu": {
+        "driver": None,
+        "nvidia_options": False,
+        "accel": False,
+        "tearfree": True,
+        "dri": True,
+        "xorg_extra_key": "integrated-gpu",
+    },
+}
+
+# The Files section is static, so it is baked into the template once at import
+# time instead of being substituted on every render.
+NVIDIA_CONF_TEMPLATE = Template(
+    MODULES_PATHS_SECTION +
+    "Section \"ServerLayout\"\n"
+    "\tIdentifier \"layout\"\n"
+    "\tScreen 0 \"nvidia\"\n"
+    "\tInactive \"${device_name}\"\n"
+    "EndSection\n\n"
+    "${nvidia_device_section}"
+    "Section \"Screen\"\n"
+    "\tIdentifier \"nvidia\"\n"
+    "\tDevice \"nvidia\"\n"
+    "\tOption \"AllowEmptyInitialConfiguration\"\n"
+    "${nvidia_screen_options}"
+    "EndSection\n\n"
+    "${integrated_device_section}"
+    "Section \"Screen\"\n"
+    "\tIdentifier \"${device_name}\"\n"
+    "\tDevice \"${device_name}\"\n"
+    "EndSection\n\n"
+    "${server_flags_section}"
+)
+
+HYBRID_CONF_TEMPLATE = Template(
+    "Section \"ServerLayout\"\n"
+    "\tIdentifier \"layout\"\n"
+    "\tScreen 0 \"${device_name}\"\n"
+    "\tInactive \"nvidia\"\n"
+    "${layout_options}"
+    "\tOption \"AllowNVIDIAGPUScreens\"\n"
+    "EndSection\n\n"
+    "${integrated_device_section}"
+    "Section \"Screen\"\n"
+    "\tIdentifier \"${device_name}\"\n"
+    "\tDevice \"${device_name}\"\n"
+    "${integrated_screen_options}"
+    "EndSection\n\n"
+    "${nvidia_device_section}"
+    "Section \"Screen\"\n"
+    "\tIdentifier \"nvidia\"\n"
+    "\tDevice \"nvidia\"\n"
+    "EndSection\n\n"
+    "${server_flags_section}"
+)
+
+
 class XorgSetupError(Exception):
     pass
 
@@ -23,12 +126,12 @@ def configure_xorg(config, requested_gpu_mode):
 
     xorg_extra = load_extra_xorg_options()
 
-    if requested_gpu_mode == "nvidia":
-        xorg_conf_text = _generate_nvidia(config, bus_ids, xorg_extra, device_name)
-    elif requested_gpu_mode == "integrated":
-        xorg_conf_text = _make_integrated_device_section(config, bus_ids, xorg_extra, device_name)
-    elif requested_gpu_mode == "hybrid":
-        xorg_conf_text = _generate_hybrid(config, bus_ids, xorg_extra, device_name)
+    try:
+        generator = XORG_CONF_GENERATORS[requested_gpu_mode]
+    except KeyError:
+        raise XorgSetupError("Unknown GPU mode %s" % requested_gpu_mode)
+
+    xorg_conf_text = generator(config, bus_ids, xorg_extra, device_name)
 
     remove_mhwd_conf()
     _write_xorg_conf(xorg_conf_text)
@@ -56,28 +159,23 @@ def default_xorg_conf(config):
 
 
 def is_xorg_running():
+    return any(processes.get_PIDs_from_process_names(["X", "Xorg"]))
 
-    try:
-        exec_bash("pidof X")
-        return True
-    except BashError:
-        pass
 
-    try:
-        exec_bash("pidof Xorg")
-        return True
-    except BashError:
-        pass
+def is_there_a_default_xorg_conf_file():
+    return _is_regular_file("/etc/X11/xorg.conf")
 
-    return False
 
+def is_there_a_MHWD_file():
+    return _is_regular_file(MHWD_CONF_PATH)
 
-def is_there_a_default_xorg_conf_file():
-    return os.path.isfile("/etc/X11/xorg.conf")
 
+def _is_regular_file(path):
 
-def is_there_a_MHWD_file():
-    return os.path.isfile("/etc/X11/xorg.conf.d/90-mhwd.conf")
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return False
 
 
 def do_xsetup(requested_mode, config):
@@ -89,11 +187,12 @@ def do_xsetup(requested_mode, config):
 
         try:
             provider = checks.get_integrated_provider()
-            if config["integrated"]["driver"] == "xorg":
-                exec_bash("xrandr --setprovideroutputsource \"%s\" NVIDIA-0" % provider)
-            else:
-                exec_bash("xrandr --setprovideroutputsource modesetting NVIDIA-0")
-            exec_bash("xrandr --auto")
+            # No AMD or Intel provider means the integrated GPU is driven by
+            # modesetting, e.g. when the Xorg intel driver is not installed.
+            if config["integrated"]["driver"] != "xorg" or provider is None:
+                provider = "modesetting"
+            exec_command(["xrandr", "--setprovideroutputsource", provider, "NVIDIA-0"])
+            exec_command(["xrandr", "--auto"])
         except BashError as e:
             logger.error("Cannot setup PRIME : %s", str(e))
 
@@ -112,9 +211,9 @@ def do_xsetup(requested_mode, config):
         return
 
     try:
-        exec_bash("xrandr --dpi %s" % dpi_str)
+        exec_command(["xrandr", "--dpi", dpi_str])
     except BashError as e:
-        raise XorgSetupError("Cannot set DPI : %s" % str(e))
+        raise XorgSetupError(f"Cannot set DPI : {e}")
 
 def _get_xsetup_script_path(requested_mode):
 
@@ -155,155 +254,133 @@ def _get_xsetup_script_path(requested_mode):
 
 def _generate_nvidia(config, bus_ids, xorg_extra, device_name):
 
-    text = _make_modules_paths_section()
-
-    text += "Section \"ServerLayout\"\n" \
-            "\tIdentifier \"layout\"\n" \
-            "\tScreen 0 \"nvidia\"\n"
-    text += "\tInactive \"%s\"\n" % device_name
-    text += "EndSection\n\n"
-
-
-    text += _make_nvidia_device_section(config, bus_ids, xorg_extra)
-
-    text += "Section \"Screen\"\n" \
-            "\tIdentifier \"nvidia\"\n" \
-            "\tDevice \"nvidia\"\n" \
-            "\tOption \"AllowEmptyInitialConfiguration\"\n"
-
+    nvidia_screen_options = ""
     if config["nvidia"]["allow_external_gpus"] == "yes":
-        text += "\tOption \"AllowExternalGpus\"\n"
+        nvidia_screen_options = "\tOption \"AllowExternalGpus\"\n"
 
-    text += "EndSection\n\n"
-
-    text += _make_integrated_device_section(config, bus_ids, xorg_extra, device_name)
-
-    text += "Section \"Screen\"\n"
-    text += "\tIdentifier \"%s\"\n" \
-            "\tDevice \"%s\"\n" \
-            "EndSection\n\n" % (device_name, device_name)
-
-    text += _make_server_flags_section(config)
-
-    return text
-
-def _make_modules_paths_section():
-
-    return "Section \"Files\"\n" \
-           "\tModulePath \"/usr/lib/nvidia\"\n" \
-           "\tModulePath \"/usr/lib32/nvidia\"\n" \
-           "\tModulePath \"/usr/lib32/nvidia/xorg/modules\"\n" \
-           "\tModulePath \"/usr/lib32/xorg/modules\"\n" \
-           "\tModulePath \"/usr/lib64/nvidia/xorg/modules\"\n" \
-           "\tModulePath \"/usr/lib64/nvidia/xorg\"\n" \
-           "\tModulePath \"/usr/lib64/xorg/modules\"\n" \
-           "EndSection\n\n"
+    return NVIDIA_CONF_TEMPLATE.substitute(
+        device_name=device_name,
+        nvidia_device_section="".join(_make_device_section("nvidia", config, bus_ids, xorg_extra)),
+        nvidia_screen_options=nvidia_screen_options,
+        integrated_device_section="".join(_make_device_section(device_name, config, bus_ids, xorg_extra)),
+        server_flags_section=_make_server_flags_section(config))
 
+def _generate_integrated(config, bus_ids, xorg_extra, device_name):
+    return "".join(_make_device_section(device_name, config, bus_ids, xorg_extra))
 
 def _generate_hybrid(config, bus_ids, xorg_extra, device_name):
 
-    text = "Section \"ServerLayout\"\n" \
-            "\tIdentifier \"layout\"\n" \
-           "\tScreen 0 \"%s\"\n" \
-           "\tInactive \"nvidia\"\n" % device_name
-    if config["integrated"]["reverseprime"] != "":
-        reverseprime_enabled_str = {"yes": "true", "no": "false"}[config["integrated"]["reverseprime"]]
-        text += "\tOption \"AllowPRIMEDisplayOffloadSink\" \"%s\"\n" % reverseprime_enabled_str
-    text += "\tOption \"AllowNVIDIAGPUScreens\"\n" \
-            "EndSection\n\n"
+    reverseprime = config["integrated"]["reverseprime"]
+    allow_external_gpus = config["nvidia"]["allow_external_gpus"]
 
-    text += _make_integrated_device_section(config, bus_ids, xorg_extra, device_name)
+    layout_options = ""
+    if reverseprime != "":
+        reverseprime_enabled_str = YES_NO_TO_BOOL_STR[reverseprime]
+        layout_options = f"\tOption \"AllowPRIMEDisplayOffloadSink\" \"{reverseprime_enabled_str}\"\n"
 
-    text += "Section \"Screen\"\n" \
-            "\tIdentifier \"%s\"\n" \
-            "\tDevice \"%s\"\n" % (device_name, device_name)
+    integrated_screen_options = ""
+    if allow_external_gpus == "yes":
+        integrated_screen_options = "\tOption \"AllowExternalGpus\"\n"
 
-    if config["nvidia"]["allow_external_gpus"] == "yes":
-        text += "\tOption \"AllowExternalGpus\"\n"
-
-    text += "EndSection\n\n"
+    return HYBRID_CONF_TEMPLATE.substitute(
+        device_name=device_name,
+        layout_options=layout_options,
+        integrated_device_section="".join(_make_device_section(device_name, config, bus_ids, xorg_extra)),
+        integrated_screen_options=integrated_screen_options,
+        nvidia_device_section="".join(_make_device_section("nvidia", config, bus_ids, xorg_extra)),
+        server_flags_section=_make_server_flags_section(config))
 
-    text += _make_nvidia_device_section(config, bus_ids, xorg_extra)
 
-    text += "Section \"Screen\"\n" \
-            "\tIdentifier \"nvidia\"\n" \
-            "\tDevice \"nvidia\"\n" \
-            "EndSection\n\n"
+XORG_CONF_GENERATORS = {
+    "nvidia": _generate_nvidia,
+    "integrated": _generate_integrated,
+    "hybrid": _generate_hybrid,
+}
 
-    text += _make_server_flags_section(config)
 
-    return text
+def _make_device_section(vendor, config, bus_ids, xorg_extra):
 
+    logger = get_logger()
 
-def _make_nvidia_device_section(config, bus_ids, xorg_extra):
+    spec = DEVICE_SECTION_SPECS[vendor]
+    integrated_config = config["integrated"]
+    driver_option = integrated_config["driver"]
 
-    options = config["nvidia"]["options"].replace(" ", "").split(",")
+    if spec["driver"] is not None:
+        driver = spec["driver"]
+    elif driver_option == "xorg" and not checks.is_xorg_integrated_module_available():
+        logger.warning("The Xorg module %s is not available. Defaulting to modesetting.", vendor)
+        driver = "modesetting"
+    elif driver_option == "xorg":
+        driver = vendor
+    else:
+        driver = "modesetting"
 
-    text = "Section \"Device\"\n" \
-           "\tIdentifier \"nvidia\"\n" \
-           "\tDriver \"nvidia\"\n"
-    text += "\tBusID \"%s\"\n" % bus_ids["nvidia"]
-    if "overclocking" in options:
-        text += "\tOption \"Coolbits\" \"28\"\n"
-    if "triple_buffer" in options:
-        text += "\tOption \"TripleBuffer\" \"true\"\n"
-    if "nvidia" in xorg_extra.keys():
-        for line in xorg_extra["nvidia"]:
-            text += ("\t" + line + "\n")
-    text += "EndSection\n\n"
+    parts = [
+        "Section \"Device\"\n",
+        f"\tIdentifier \"{vendor}\"\n",
+        f"\tDriver \"{driver}\"\n",
+        f"\tBusID \"{bus_ids[vendor]}\"\n",
+    ]
 
-    return text
+    if spec["nvidia_options"]:
+        options = config["nvidia"]["_options_set"]
+        if "overclocking" in options:
+            parts.append("\tOption \"Coolbits\" \"28\"\n")
+        if "triple_buffer" in options:
+            parts.append("\tOption \"TripleBuffer\" \"true\"\n")
 
+    if spec["accel"] and integrated_config["accel"] != "":
+        parts.append(f"\tOption \"AccelMethod\" \"{integrated_config['accel']}\"\n")
 
-def _make_integrated_device_section(config, bus_ids, xorg_extra, device_name):
+    if spec["tearfree"] and integrated_config["tearfree"] != "" and driver_option == "xorg":
+        tearfree_enabled_str = YES_NO_TO_BOOL_STR[integrated_config["tearfree"]]
+        parts.append(f"\tOption \"TearFree\" \"{tearfree_enabled_str}\"\n")
 
-    logger = get_logger()
+    if spec["dri"]:
+        parts.append(f"\tOption \"DRI\" \"{int(integrated_config['dri'])}\"\n")
 
-    dri = int(config["integrated"]["dri"])
+    for line in xorg_extra.get(spec["xorg_extra_key"], []):
+        parts.append(f"\t{line}\n")
 
-    text = "Section \"Device\"\n"
-    text += "\tIdentifier \"%s\"\n" % device_name
-    if config["integrated"]["driver"] == "xorg" and not checks.is_xorg_integrated_module_available():
-        logger.warning("The Xorg module %s is not available. Defaulting to modesetting." % device_name)
-        driver = "modesetting"
-    elif config["integrated"]["driver"] == "xorg":
-        driver = device_name
-    elif config["integrated"]["driver"] != "xorg":
-        driver = "modesetting"
-    text += "\tDriver \"%s\"\n" % driver
-    text += "\tBusID \"%s\"\n" % bus_ids[device_name]
-    if config["integrated"]["accel"] != "" and "intel" in bus_ids:
-        text += "\tOption \"AccelMethod\" \"%s\"\n" % config["integrated"]["accel"]
-    if config["integrated"]["tearfree"] != "" and config["integrated"]["driver"] == "xorg":
-        tearfree_enabled_str = {"yes": "true", "no": "false"}[config["integrated"]["tearfree"]]
-        text += "\tOption \"TearFree\" \"%s\"\n" % tearfree_enabled_str
-    text += "\tOption \"DRI\" \"%d\"\n" % dri
-    for line in xorg_extra["integrated-gpu"]:
-        text += ("\t" + line + "\n")
-    text += "EndSection\n\n"
+    parts.append("EndSection\n\n")
 
-    return text
+    return parts
 
 
 def _make_server_flags_section(config):
-    if config["nvidia"]["ignore_abi"] == "yes":
-        return (
-            "Section \"ServerFlags\"\n"
-            "\tOption \"IgnoreABI\" \"1\"\n"
-            "EndSection\n\n"
-        )
-    return ""
+    return SERVER_FLAGS_SECTIONS[config["nvidia"]["ignore_abi"]]
 
 def _write_xorg_conf(xorg_conf_text):
 
     logger = get_logger()
 
     filepath = Path(envs.XORG_CONF_PATH)
+    tmp_filepath = filepath.parent / (".%s.tmp" % filepath.name)
+
+    xorg_conf_data = xorg_conf_text.encode("utf8")
 
     try:
-        os.makedirs(filepath.parent, mode=0o755, exist_ok=True)
-        with open(filepath, 'w') as f:
-            logger.info("Writing to %s", envs.XORG_CONF_PATH)
-            f.write(xorg_conf_text)
-    except IOError:
+        if filepath.read_bytes() == xorg_conf_data:
+            logger.info("%s is already up to date", envs.XORG_CONF_PATH)
+            return
+    except OSError:
+        pass
+
+    try:
+        if not os.path.isdir(filepath.parent):
+            os.makedirs(filepath.parent, mode=0o755, exist_ok=True)
+        logger.info("Writing to %s", envs.XORG_CONF_PATH)
+        fd = os.open(tmp_filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, xorg_conf_data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.rename(tmp_filepath, filepath)
+    except OSError:
+        try:
+            os.unlink(tmp_filepath)
+        except OSError:
+            pass
         raise XorgSetupError("Cannot write Xorg conf at %s" % str(filepath))